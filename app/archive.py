@@ -0,0 +1,90 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy import Engine, delete, insert, union_all
+from sqlmodel import Session, select
+
+from app.models import ArchivedTransaction, Transaction
+
+ARCHIVE_BATCH_SIZE = 1000
+INCREMENTAL_AUTO_VACUUM = 2
+
+# Held while an archive job runs, so a second request cannot start another
+# one in this process
+archive_lock = threading.Lock()
+
+TRANSACTION_COLUMNS = ("id", "amount", "description", "customer_id", "created_at")
+
+
+def select_all_transactions():
+    """Hot and cold transactions as a single selectable.
+
+    A UNION ALL has no defined order; callers must `order_by` its `id`.
+    """
+    hot = select(*(getattr(Transaction, name) for name in TRANSACTION_COLUMNS))
+    cold = select(*(getattr(ArchivedTransaction, name) for name in TRANSACTION_COLUMNS))
+    return union_all(hot, cold).subquery("all_transactions")
+
+
+def get_any_transaction(
+    session: Session, transaction_id: int
+) -> Transaction | ArchivedTransaction | None:
+    return session.get(Transaction, transaction_id) or session.get(
+        ArchivedTransaction, transaction_id
+    )
+
+
+def archive_transactions(
+    engine: Engine, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """Move transactions created before `cutoff` into the archive database.
+
+    Every batch is copied and removed in its own transaction, so the job can
+    be interrupted at any point and simply run again to pick up where it
+    stopped. Returns the number of rows moved.
+    """
+    moved = 0
+    while True:
+        with Session(engine) as session:
+            ids = session.exec(
+                select(Transaction.id)
+                .where(Transaction.created_at < cutoff)
+                .order_by(Transaction.id)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                return moved
+            columns = [getattr(Transaction, name) for name in TRANSACTION_COLUMNS]
+            session.exec(
+                insert(ArchivedTransaction).from_select(
+                    list(TRANSACTION_COLUMNS),
+                    select(*columns).where(Transaction.id.in_(ids)),
+                )
+            )
+            session.exec(delete(Transaction).where(Transaction.id.in_(ids)))
+            session.commit()
+            moved += len(ids)
+
+
+def reclaim_free_pages(engine: Engine):
+    """Give the pages freed by archiving back to the filesystem, so the hot
+    file actually shrinks."""
+    with engine.connect() as conn:
+        auto_vacuum = conn.exec_driver_sql("PRAGMA main.auto_vacuum").scalar()
+        if auto_vacuum != INCREMENTAL_AUTO_VACUUM:
+            # Switching modes only takes effect after one full VACUUM
+            conn.exec_driver_sql("PRAGMA main.auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM main")
+        else:
+            # The pragma frees one page per step, so step through all of them
+            cursor = conn.connection.driver_connection.cursor()
+            cursor.execute("PRAGMA main.incremental_vacuum").fetchall()
+
+
+def run_archive_job(engine: Engine, cutoff: datetime):
+    """Background entry point; expects `archive_lock` to be held already."""
+    try:
+        archive_transactions(engine, cutoff)
+        reclaim_free_pages(engine)
+    finally:
+        archive_lock.release()
@@ -0,0 +1,65 @@
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from app.changes import record_deletes
+from app.models import (
+    ArchivedTransaction,
+    ChangeEntity,
+    Customer,
+    CustomerPlan,
+    Plan,
+    Transaction,
+)
+
+
+def delete_customers(session: Session, customer_ids: list[int]) -> list[int]:
+    """Delete customers with their transactions (hot and archived) and
+    subscriptions, one set-based statement per table. Every deleted row is
+    also recorded in the change feed.
+
+    Nothing is committed; returns the ids of the customers deleted.
+    """
+    owned_by_customers = Transaction.customer_id.in_(customer_ids)
+    record_deletes(
+        session, ChangeEntity.TRANSACTION, Transaction.id, owned_by_customers
+    )
+    session.exec(delete(Transaction).where(owned_by_customers))
+
+    archived_by_customers = ArchivedTransaction.customer_id.in_(customer_ids)
+    record_deletes(
+        session,
+        ChangeEntity.TRANSACTION,
+        ArchivedTransaction.id,
+        archived_by_customers,
+    )
+    session.exec(delete(ArchivedTransaction).where(archived_by_customers))
+
+    subscribed_customers = CustomerPlan.customer_id.in_(customer_ids)
+    record_deletes(
+        session, ChangeEntity.SUBSCRIPTION, CustomerPlan.id, subscribed_customers
+    )
+    session.exec(delete(CustomerPlan).where(subscribed_customers))
+
+    record_deletes(
+        session, ChangeEntity.CUSTOMER, Customer.id, Customer.id.in_(customer_ids)
+    )
+    return (
+        session.exec(
+            delete(Customer).where(Customer.id.in_(customer_ids)).returning(Customer.id)
+        )
+        .scalars()
+        .all()
+    )
+
+
+def delete_plans(session: Session, plan_ids: list[int]) -> int:
+    """Delete plans with their subscriptions, recording the subscription
+    deletes in the change feed. Nothing is committed; returns the number of
+    plans deleted.
+    """
+    subscribed_plans = CustomerPlan.plan_id.in_(plan_ids)
+    record_deletes(
+        session, ChangeEntity.SUBSCRIPTION, CustomerPlan.id, subscribed_plans
+    )
+    session.exec(delete(CustomerPlan).where(subscribed_plans))
+    return session.exec(delete(Plan).where(Plan.id.in_(plan_ids))).rowcount
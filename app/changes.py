@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import ColumnElement, insert, literal
+from sqlmodel import Session, select
+
+from app.models import Change, ChangeEntity, ChangeOperation
+
+
+def record_change(
+    session: Session, operation: ChangeOperation, entity: ChangeEntity, entity_id: int
+):
+    """Append a change to the feed as part of the caller's transaction."""
+    session.add(Change(operation=operation, entity=entity, entity_id=entity_id))
+
+
+def record_deletes(
+    session: Session,
+    entity: ChangeEntity,
+    entity_id: ColumnElement[int],
+    *criteria: ColumnElement[bool],
+):
+    """Append a delete for every row matching `criteria`, with one
+    INSERT ... SELECT. Must run before the rows themselves are deleted.
+    """
+    columns = Change.__table__.c
+    session.exec(
+        insert(Change).from_select(
+            ["operation", "entity", "entity_id", "created_at"],
+            select(
+                literal(ChangeOperation.DELETE, columns.operation.type),
+                literal(entity, columns.entity.type),
+                entity_id,
+                literal(datetime.now(timezone.utc), columns.created_at.type),
+            )
+            .where(*criteria)
+            .order_by(entity_id),
+        )
+    )
+
+
+def get_changes_since(session: Session, since: int, limit: int) -> list[Change]:
+    query = select(Change).where(Change.seq > since).order_by(Change.seq).limit(limit)
+    return session.exec(query).all()
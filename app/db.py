@@ -1,14 +1,39 @@
+from datetime import datetime, timezone
 from typing import Annotated
 
 from fastapi import Depends, FastAPI
 from fastapi.concurrency import asynccontextmanager
+from sqlalchemy import (
+    Engine,
+    MetaData,
+    Table,
+    event,
+    insert,
+    inspect,
+    literal,
+    select,
+)
 from sqlmodel import Session, SQLModel, create_engine
 
+from app.profiling import log_slow_queries
+
 sqlite_file_name = "db.sqlite3"
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
+# Cold transactions live in a separate file attached to every connection
+archive_file_name = "archive.sqlite3"
+ARCHIVE_SCHEMA = "archive"
+
+
+def attach_archive(engine: Engine, database: str = archive_file_name):
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"ATTACH DATABASE '{database}' AS {ARCHIVE_SCHEMA}")
+
 
 engine = create_engine(sqlite_url, echo=True)
+attach_archive(engine)
+log_slow_queries(engine)
 
 
 def get_session():
@@ -16,9 +41,65 @@ def get_session():
         yield session
 
 
+def migrate_transaction_table(engine: Engine):
+    """Rebuild a `transaction` table created before archiving existed.
+
+    Such tables lack `created_at` and AUTOINCREMENT, and SQLite can only add
+    the latter by copying the rows into a new table. Existing rows get the
+    migration time as `created_at`, since their real age is unknown.
+    """
+    transaction = SQLModel.metadata.tables["transaction"]
+    with engine.begin() as conn:
+        table_sql = conn.exec_driver_sql(
+            "SELECT sql FROM main.sqlite_master "
+            "WHERE type = 'table' AND name = 'transaction'"
+        ).scalar()
+        if table_sql is None or "AUTOINCREMENT" in table_sql:
+            return
+        # pysqlite does not open transactions for DDL on its own
+        conn.exec_driver_sql("BEGIN")
+        conn.exec_driver_sql('ALTER TABLE main."transaction" RENAME TO transaction_old')
+        old_indexes = conn.exec_driver_sql(
+            "SELECT name FROM main.sqlite_master WHERE type = 'index' "
+            "AND tbl_name = 'transaction_old' AND sql IS NOT NULL"
+        ).scalars()
+        for index_name in old_indexes.all():
+            conn.exec_driver_sql(f'DROP INDEX main."{index_name}"')
+        transaction.create(conn)
+        old = Table(
+            "transaction_old", MetaData(), autoload_with=conn, resolve_fks=False
+        )
+        created_at = literal(datetime.now(timezone.utc), transaction.c.created_at.type)
+        conn.execute(
+            insert(transaction).from_select(
+                ["id", "amount", "description", "customer_id", "created_at"],
+                select(
+                    old.c.id,
+                    old.c.amount,
+                    old.c.description,
+                    old.c.customer_id,
+                    created_at,
+                ),
+            )
+        )
+        conn.exec_driver_sql("DROP TABLE main.transaction_old")
+
+
+def create_missing_indexes(engine: Engine):
+    # create_all skips existing tables, and with them any index added later
+    inspector = inspect(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name, schema=table.schema):
+            continue
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
 @asynccontextmanager
-def create_db_and_tables(app: FastAPI):
+async def create_db_and_tables(app: FastAPI):
     SQLModel.metadata.create_all(engine)
+    migrate_transaction_table(engine)
+    create_missing_indexes(engine)
     yield
 
 
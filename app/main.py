@@ -4,7 +4,13 @@ from datetime import datetime
 from fastapi import FastAPI, Request
 
 from app.db import create_db_and_tables
-from app.routes import customers, plans, transactions
+from app.profiling import (
+    StackSampler,
+    has_profile_token,
+    save_profile,
+    should_profile,
+)
+from app.routes import changes, customers, plans, transactions
 
 app = FastAPI(
     lifespan=create_db_and_tables,
@@ -13,6 +19,7 @@ app = FastAPI(
 app.include_router(customers.router)
 app.include_router(transactions.router)
 app.include_router(plans.router)
+app.include_router(changes.router)
 
 
 @app.middleware("http")
@@ -27,6 +34,20 @@ async def log_request_time(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    if not should_profile(request):
+        return await call_next(request)
+    with StackSampler() as sampler:
+        response = await call_next(request)
+    profile_path = save_profile(sampler, request)
+    # Sampled requests may come from anyone; only say where the file is to
+    # holders of the token
+    if has_profile_token(request):
+        response.headers["X-Profile-File"] = profile_path.name
+    return response
+
+
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
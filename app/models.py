@@ -1,8 +1,11 @@
+from datetime import datetime, timezone
 from enum import Enum
 
 from pydantic import BaseModel, EmailStr
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.db import ARCHIVE_SCHEMA
+
 
 # --- CustomerPlan ---
 class StatusEnum(str, Enum):
@@ -12,8 +15,8 @@ class StatusEnum(str, Enum):
 
 class CustomerPlan(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="plan.id")
-    customer_id: int = Field(foreign_key="customer.id")
+    plan_id: int = Field(foreign_key="plan.id", index=True)
+    customer_id: int = Field(foreign_key="customer.id", index=True)
     status: StatusEnum = Field(default=StatusEnum.ACTIVE)
 
 
@@ -87,7 +90,7 @@ class TransactionBase(SQLModel):
     amount: float = Field(...)
     description: str | None = Field(None)
 
-    customer_id: int = Field(foreign_key="customer.id")
+    customer_id: int = Field(foreign_key="customer.id", index=True)
 
 
 class TransactionCreate(TransactionBase):
@@ -102,12 +105,30 @@ class TransactionUpdate(SQLModel):
 
 
 class Transaction(TransactionBase, table=True):
+    # AUTOINCREMENT keeps ids of archived rows from being reused
+    __table_args__ = {"sqlite_autoincrement": True}
+
     id: int | None = Field(default=None, primary_key=True)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), index=True
+    )
     customer: Customer = Relationship(back_populates="transactions")
 
 
+class ArchivedTransaction(SQLModel, table=True):
+    __tablename__ = "transaction"
+    __table_args__ = {"schema": ARCHIVE_SCHEMA}
+
+    id: int = Field(primary_key=True)
+    amount: float = Field(...)
+    description: str | None = Field(None)
+    customer_id: int = Field(index=True)
+    created_at: datetime = Field(index=True)
+
+
 class TransactionPublic(TransactionBase):
     id: int
+    created_at: datetime
 
 
 class InvoiceBase(BaseModel):
@@ -119,3 +140,37 @@ class InvoiceBase(BaseModel):
     @property
     def amount_total(self):
         return sum([transaction.amount for transaction in self.transactions])
+
+
+# --- Change feed ---
+
+
+class ChangeOperation(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class ChangeEntity(str, Enum):
+    CUSTOMER = "customer"
+    SUBSCRIPTION = "subscription"
+    TRANSACTION = "transaction"
+
+
+class ChangeBase(SQLModel):
+    operation: ChangeOperation = Field(...)
+    entity: ChangeEntity = Field(...)
+    entity_id: int = Field(...)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class Change(ChangeBase, table=True):
+    # SQLite serializes writers, so seq order is also commit order and
+    # AUTOINCREMENT guarantees a seq is never handed out twice
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: int | None = Field(default=None, primary_key=True)
+
+
+class ChangePublic(ChangeBase):
+    seq: int
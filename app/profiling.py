@@ -0,0 +1,171 @@
+import asyncio
+import os
+import random
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import Request
+from sqlalchemy import Engine, event
+
+# Requests carrying this token in the X-Profile header are always profiled
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = 0.001
+PROFILE_DIR = Path("profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+
+SLOW_QUERY_THRESHOLD = float(os.getenv("SLOW_QUERY_THRESHOLD", "0.1"))
+SLOW_QUERY_LOG = "slow_queries.log"
+
+
+# Marks the tasks serving a profiled request; tasks spawned for the request
+# inherit it with the rest of the context
+profiled_request: ContextVar[object | None] = ContextVar(
+    "profiled_request", default=None
+)
+
+
+def has_profile_token(request: Request) -> bool:
+    token = request.headers.get("X-Profile")
+    return bool(
+        token and PROFILE_TOKEN and secrets.compare_digest(token, PROFILE_TOKEN)
+    )
+
+
+def should_profile(request: Request) -> bool:
+    return has_profile_token(request) or random.random() < PROFILE_SAMPLE_RATE
+
+
+class StackSampler:
+    """Periodically samples the stack of the event loop thread, keeping only
+    the samples taken while a task of this request is running.
+
+    Other requests on the same loop and the time this request spends
+    awaiting are left out. Stacks are aggregated in the collapsed ("folded")
+    format read by flamegraph.pl, speedscope and most other flame graph
+    viewers.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter[str] = Counter()
+        self._marker = object()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._token = profiled_request.set(self._marker)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        profiled_request.reset(self._token)
+
+    def _request_is_running(self) -> bool:
+        task = asyncio.current_task(self.loop)
+        return (
+            task is not None
+            and task.get_context().get(profiled_request) is self._marker
+        )
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self._request_is_running():
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            # The loop may have switched tasks while the stack was walked
+            if stack and self._request_is_running():
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def save_profile(sampler: StackSampler, request: Request) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    name = request.url.path.strip("/").replace("/", "_") or "root"
+    path = PROFILE_DIR / (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{name}-"
+        f"{uuid4().hex[:8]}.folded"
+    )
+    path.write_text(sampler.folded())
+    old_profiles = sorted(PROFILE_DIR.glob("*.folded"), key=lambda p: p.stat().st_mtime)
+    # Always keep at least the profile just written
+    keep = max(PROFILE_MAX_FILES, 1)
+    for old_profile in old_profiles[: max(len(old_profiles) - keep, 0)]:
+        old_profile.unlink(missing_ok=True)
+    return path
+
+
+def explain_query_plan(dbapi_connection, statement: str, parameters) -> list[str]:
+    try:
+        rows = dbapi_connection.execute(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).fetchall()
+    except sqlite3.Error as e:
+        return [f"unavailable ({e})"]
+    return [row[-1] for row in rows]
+
+
+def log_slow_queries(
+    engine: Engine,
+    threshold: float = SLOW_QUERY_THRESHOLD,
+    log_file: str = SLOW_QUERY_LOG,
+):
+    # The start time lives on the execution context, which is discarded with
+    # the statement whether it succeeds or fails
+    def write_if_slow(context, cursor, statement, parameters, error=None):
+        query_time = time.perf_counter() - context._query_start_time
+        if query_time < threshold:
+            return
+        if context.executemany:
+            parameters = parameters[0] if parameters else ()
+        plan = []
+        if cursor is not None:
+            plan = explain_query_plan(cursor.connection, statement, parameters)
+        with open(log_file, "a") as f:
+            f.write(f"SLOW QUERY {query_time:.6f}s: {statement}\n")
+            f.write(f"  params: {parameters}\n")
+            if error is not None:
+                f.write(f"  error: {error!r}\n")
+            for detail in plan:
+                f.write(f"  plan: {detail}\n")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        context._query_start_time = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def log_slow_query(conn, cursor, statement, parameters, context, executemany):
+        write_if_slow(context, cursor, statement, parameters)
+
+    @event.listens_for(engine, "handle_error")
+    def log_slow_failed_query(exception_context):
+        context = exception_context.execution_context
+        if context is None or not hasattr(context, "_query_start_time"):
+            return
+        write_if_slow(
+            context,
+            context.cursor,
+            exception_context.statement,
+            exception_context.parameters,
+            error=exception_context.original_exception,
+        )
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from typing import Annotated
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Engine
+from sqlmodel import Session
+
+from app.changes import get_changes_since
+from app.db import SessionDep
+from app.models import ChangePublic
+
+# Pending changes are found with an indexed seek on seq, so polling is cheap
+# and also picks up rows written by other worker processes
+CHANGES_POLL_INTERVAL = 0.5
+SSE_KEEPALIVE_INTERVAL = 15
+MAX_TIMEOUT = 300
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["Changes"],
+)
+
+
+async def stream_changes(engine: Engine, since: int, limit: int, timeout: float):
+    deadline = time.monotonic() + (timeout or 0)
+    last_sent = time.monotonic()
+    with Session(engine) as session:
+        while True:
+            changes = [
+                ChangePublic.model_validate(change)
+                for change in get_changes_since(session, since, limit)
+            ]
+            # Give the connection back to the pool while the client reads
+            session.rollback()
+            for change in changes:
+                since = change.seq
+                data = change.model_dump_json()
+                yield f"id: {change.seq}\nevent: change\ndata: {data}\n\n"
+            if changes:
+                last_sent = time.monotonic()
+                continue
+            if time.monotonic() >= deadline:
+                return
+            if time.monotonic() - last_sent >= SSE_KEEPALIVE_INTERVAL:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(CHANGES_POLL_INTERVAL)
+
+
+@router.get("", response_model=list[ChangePublic])
+async def get_changes(
+    request: Request,
+    session: SessionDep,
+    since: Annotated[int, Query(ge=0, description="Último seq recibido")] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    timeout: Annotated[
+        float | None,
+        Query(
+            ge=0,
+            le=MAX_TIMEOUT,
+            description="Segundos a esperar cambios (long-poll, por defecto 0) "
+            "o a mantener abierto el stream (SSE, por defecto 300)",
+        ),
+    ] = None,
+    last_event_id: Annotated[int | None, Header()] = None,
+):
+    if "text/event-stream" in request.headers.get("accept", ""):
+        # EventSource reconnects send the last seq they saw as Last-Event-ID
+        if last_event_id is not None:
+            since = max(since, last_event_id)
+        # Starlette cancels the stream as soon as the client disconnects
+        stream_timeout = MAX_TIMEOUT if timeout is None else timeout
+        return StreamingResponse(
+            stream_changes(session.get_bind(), since, limit, stream_timeout),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    deadline = time.monotonic() + (timeout or 0)
+    changes = get_changes_since(session, since, limit)
+    while not changes and time.monotonic() < deadline:
+        session.rollback()
+        await asyncio.sleep(CHANGES_POLL_INTERVAL)
+        changes = get_changes_since(session, since, limit)
+    return changes
@@ -4,8 +4,12 @@ from fastapi import APIRouter, HTTPException, Query, status
 from fastapi.responses import Response
 from sqlmodel import select
 
+from app.cascade import delete_customers
+from app.changes import record_change
 from app.db import SessionDep
 from app.models import (
+    ChangeEntity,
+    ChangeOperation,
     Customer,
     CustomerCreate,
     CustomerPlan,
@@ -27,6 +31,8 @@ async def create_customer(
 ) -> CustomerPublic:
     customer = Customer.model_validate(customer_data)
     session.add(customer)
+    session.flush()
+    record_change(session, ChangeOperation.CREATE, ChangeEntity.CUSTOMER, customer.id)
     session.commit()
     session.refresh(customer)
     return customer
@@ -59,19 +65,29 @@ async def update_customer(
     customer_data_dict = customer_data.model_dump(exclude_unset=True)
     customer.sqlmodel_update(customer_data_dict)
     session.add(customer)
+    record_change(session, ChangeOperation.UPDATE, ChangeEntity.CUSTOMER, customer.id)
     session.commit()
     session.refresh(customer)
     return customer
 
 
+@router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
+async def bulk_delete_customers(
+    session: SessionDep,
+    ids: Annotated[list[int], Query(description="Ids de los clientes a eliminar")],
+) -> Response:
+    delete_customers(session, ids)
+    session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @router.delete("/{customer_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_customer(customer_id: int, session: SessionDep) -> Response:
-    customer = session.get(Customer, customer_id)
-    if not customer:
+    if not delete_customers(session, [customer_id]):
+        session.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Customer not found"
         )
-    session.delete(customer)
     session.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -89,6 +105,10 @@ async def subscribe_customer_to_plan(
         )
     customer_plan = CustomerPlan(plan_id=plan.id, customer_id=customer.id)
     session.add(customer_plan)
+    session.flush()
+    record_change(
+        session, ChangeOperation.CREATE, ChangeEntity.SUBSCRIPTION, customer_plan.id
+    )
     session.commit()
     session.refresh(customer_plan)
     return customer_plan
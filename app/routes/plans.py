@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException, Response, status
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query, Response, status
 from sqlmodel import select
 
+from app.cascade import delete_plans
 from app.db import SessionDep
 from app.models import Plan, PlanCreate, PlanPublic, PlanUpdate
 
@@ -51,13 +54,22 @@ async def update_plan(
     return plan
 
 
+@router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
+async def bulk_delete_plans(
+    session: SessionDep,
+    ids: Annotated[list[int], Query(description="Ids de los planes a eliminar")],
+):
+    delete_plans(session, ids)
+    session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @router.delete("/{plan_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_plan(plan_id: int, session: SessionDep):
-    plan = session.get(Plan, plan_id)
-    if not plan:
+    if not delete_plans(session, [plan_id]):
+        session.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found"
         )
-    session.delete(plan)
     session.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
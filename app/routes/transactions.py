@@ -1,10 +1,27 @@
+from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    HTTPException,
+    Query,
+    Response,
+    status,
+)
 from sqlmodel import select
 
+from app.archive import (
+    archive_lock,
+    get_any_transaction,
+    run_archive_job,
+    select_all_transactions,
+)
+from app.changes import record_change
 from app.db import SessionDep
 from app.models import (
+    ChangeEntity,
+    ChangeOperation,
     Customer,
     Transaction,
     TransactionCreate,
@@ -30,6 +47,10 @@ async def create_transaction(
         )
     transaction = Transaction.model_validate(transaction_data)
     session.add(transaction)
+    session.flush()
+    record_change(
+        session, ChangeOperation.CREATE, ChangeEntity.TRANSACTION, transaction.id
+    )
     session.commit()
     session.refresh(transaction)
     return transaction
@@ -41,15 +62,45 @@ async def get_transactions(
     skip: Annotated[int, Query(description="Cantidad de registros a saltar")] = 0,
     limit: Annotated[int, Query(description="Cantidad de registros a mostrar")] = 100,
 ) -> list[TransactionPublic]:
-    query = select(Transaction).offset(skip).limit(limit)
-    return session.exec(query).all()
+    all_transactions = select_all_transactions()
+    query = (
+        select(*all_transactions.c)
+        .order_by(all_transactions.c.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return [row._mapping for row in session.exec(query).all()]
+
+
+@router.post("/archive", status_code=status.HTTP_202_ACCEPTED)
+async def archive_old_transactions(
+    session: SessionDep,
+    background_tasks: BackgroundTasks,
+    older_than_days: Annotated[
+        int,
+        Query(ge=0, le=36500, description="Antigüedad mínima en días para archivar"),
+    ] = 365,
+):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    if not archive_lock.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="An archive job is already running",
+        )
+    # From here on only run_archive_job may release the lock
+    try:
+        background_tasks.add_task(run_archive_job, session.get_bind(), cutoff)
+    except BaseException:
+        archive_lock.release()
+        raise
+    return {"cutoff": cutoff}
 
 
 @router.get("/{transaction_id}")
 async def get_transaction(
     transaction_id: int, session: SessionDep
 ) -> TransactionPublic:
-    transaction = session.get(Transaction, transaction_id)
+    transaction = get_any_transaction(session, transaction_id)
     if not transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
@@ -61,7 +112,7 @@ async def get_transaction(
 async def update_transaction(
     transaction_id: int, transaction_data: TransactionUpdate, session: SessionDep
 ) -> TransactionPublic:
-    transaction = session.get(Transaction, transaction_id)
+    transaction = get_any_transaction(session, transaction_id)
     if not transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
@@ -69,6 +120,9 @@ async def update_transaction(
     transaction_data_dict = transaction_data.model_dump(exclude_unset=True)
     transaction.sqlmodel_update(transaction_data_dict)
     session.add(transaction)
+    record_change(
+        session, ChangeOperation.UPDATE, ChangeEntity.TRANSACTION, transaction.id
+    )
     session.commit()
     session.refresh(transaction)
     return transaction
@@ -76,11 +130,14 @@ async def update_transaction(
 
 @router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_transaction(transaction_id: int, session: SessionDep):
-    transaction = session.get(Transaction, transaction_id)
+    transaction = get_any_transaction(session, transaction_id)
     if not transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
         )
     session.delete(transaction)
+    record_change(
+        session, ChangeOperation.DELETE, ChangeEntity.TRANSACTION, transaction_id
+    )
     session.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
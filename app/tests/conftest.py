@@ -3,7 +3,7 @@ from fastapi.testclient import TestClient
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
 
-from app.db import get_session
+from app.db import attach_archive, get_session
 from app.main import app
 
 
@@ -12,6 +12,7 @@ def session_fixture():
     engine = create_engine(
         "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
     )
+    attach_archive(engine, ":memory:")
     print("Creating tablesssssssssssss")
     SQLModel.metadata.create_all(engine)
     with Session(engine) as session:
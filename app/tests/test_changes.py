@@ -0,0 +1,177 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.changes import record_change
+from app.models import (
+    ArchivedTransaction,
+    ChangeEntity,
+    ChangeOperation,
+    CustomerPlan,
+    Transaction,
+)
+from app.routes import changes
+from app.tests.test_customers import create_test_customer, create_test_plan
+
+
+def test_changes_are_recorded(client: TestClient, session: Session):
+    response = client.post(
+        "/customers/", json={"name": "John Doe", "email": "john@example.com"}
+    )
+    customer_id = response.json()["id"]
+    response = client.post(
+        "/transactions/", json={"amount": 10.0, "customer_id": customer_id}
+    )
+    transaction_id = response.json()["id"]
+    client.patch(f"/transactions/{transaction_id}", json={"amount": 20.0})
+    client.delete(f"/transactions/{transaction_id}")
+    client.delete(f"/customers/{customer_id}")
+
+    response = client.get("/changes")
+    assert response.status_code == 200
+    changes = response.json()
+    assert [(c["operation"], c["entity"], c["entity_id"]) for c in changes] == [
+        ("create", "customer", customer_id),
+        ("create", "transaction", transaction_id),
+        ("update", "transaction", transaction_id),
+        ("delete", "transaction", transaction_id),
+        ("delete", "customer", customer_id),
+    ]
+    seqs = [c["seq"] for c in changes]
+    assert seqs == sorted(seqs)
+
+    response = client.get(f"/changes?since={seqs[2]}")
+    assert [c["seq"] for c in response.json()] == seqs[3:]
+
+
+def test_subscription_change(client: TestClient, session: Session):
+    customer = create_test_customer(session)
+    plan = create_test_plan(session)
+    response = client.post(f"/customers/{customer.id}/subscribe/{plan.id}")
+    subscription_id = response.json()["id"]
+
+    response = client.get("/changes")
+    changes = response.json()
+    assert len(changes) == 1
+    assert changes[0]["operation"] == "create"
+    assert changes[0]["entity"] == "subscription"
+    assert changes[0]["entity_id"] == subscription_id
+
+
+def test_bulk_delete_changes(client: TestClient, session: Session):
+    customer_id = create_test_customer(session).id
+    client.delete("/customers/", params={"ids": [customer_id, 999]})
+
+    response = client.get("/changes")
+    changes = response.json()
+    assert [(c["operation"], c["entity_id"]) for c in changes] == [
+        ("delete", customer_id)
+    ]
+
+
+def test_delete_customer_records_cascaded_deletes(client: TestClient, session: Session):
+    customer_id = create_test_customer(session).id
+    plan_id = create_test_plan(session).id
+    subscription = CustomerPlan(customer_id=customer_id, plan_id=plan_id)
+    transaction = Transaction(amount=10.0, customer_id=customer_id)
+    archived = ArchivedTransaction(
+        id=1000,
+        amount=5.0,
+        customer_id=customer_id,
+        created_at=datetime.now(timezone.utc),
+    )
+    session.add_all([subscription, transaction, archived])
+    session.commit()
+    subscription_id, transaction_id = subscription.id, transaction.id
+
+    response = client.delete(f"/customers/{customer_id}")
+    assert response.status_code == 204
+
+    response = client.get("/changes")
+    assert [(c["operation"], c["entity"], c["entity_id"]) for c in response.json()] == [
+        ("delete", "transaction", transaction_id),
+        ("delete", "transaction", 1000),
+        ("delete", "subscription", subscription_id),
+        ("delete", "customer", customer_id),
+    ]
+
+
+def test_delete_plan_records_subscription_deletes(client: TestClient, session: Session):
+    customer_id = create_test_customer(session).id
+    plan_id = create_test_plan(session).id
+    subscription = CustomerPlan(customer_id=customer_id, plan_id=plan_id)
+    session.add(subscription)
+    session.commit()
+    subscription_id = subscription.id
+
+    response = client.delete(f"/plans/{plan_id}")
+    assert response.status_code == 204
+
+    response = client.get("/changes")
+    assert [(c["operation"], c["entity"], c["entity_id"]) for c in response.json()] == [
+        ("delete", "subscription", subscription_id)
+    ]
+
+
+def test_failed_delete_records_nothing(client: TestClient):
+    response = client.delete("/customers/999")
+    assert response.status_code == 404
+    response = client.get("/changes")
+    assert response.json() == []
+
+
+def test_long_poll_times_out_without_changes(client: TestClient):
+    response = client.get("/changes?timeout=0.1")
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_changes_stream(client: TestClient, session: Session):
+    customer = create_test_customer(session)
+    client.patch(f"/customers/{customer.id}", json={"name": "First"})
+    client.patch(f"/customers/{customer.id}", json={"name": "Second"})
+
+    response = client.get(
+        "/changes?timeout=0",
+        headers={"Accept": "text/event-stream", "Last-Event-ID": "1"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [event for event in response.text.split("\n\n") if event]
+    assert len(events) == 1
+    lines = events[0].splitlines()
+    assert lines[0] == "id: 2"
+    assert lines[1] == "event: change"
+    data = json.loads(lines[2].removeprefix("data: "))
+    assert data["seq"] == 2
+    assert data["operation"] == "update"
+    assert data["entity"] == "customer"
+
+
+def test_changes_stream_delivers_new_changes(
+    session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(changes, "CHANGES_POLL_INTERVAL", 0.01)
+
+    async def first_event():
+        stream = changes.stream_changes(
+            session.get_bind(), since=0, limit=100, timeout=changes.MAX_TIMEOUT
+        )
+        next_event = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.1)
+        # Nothing to send yet, so the stream stays open and keeps polling
+        assert not next_event.done()
+
+        record_change(session, ChangeOperation.CREATE, ChangeEntity.CUSTOMER, 42)
+        session.commit()
+        event = await asyncio.wait_for(next_event, timeout=1)
+        await stream.aclose()
+        return event
+
+    event = asyncio.run(first_event())
+    assert event.startswith("id: 1\nevent: change\n")
+    assert json.loads(event.splitlines()[2].removeprefix("data: "))["entity_id"] == 42
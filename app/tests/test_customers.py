@@ -1,7 +1,17 @@
+from datetime import datetime, timezone
+
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, create_engine, inspect, select
 
-from app.models import Customer, CustomerCreate, Plan
+from app.db import create_missing_indexes
+from app.models import (
+    ArchivedTransaction,
+    Customer,
+    CustomerCreate,
+    CustomerPlan,
+    Plan,
+    Transaction,
+)
 
 
 def create_test_customer(session: Session) -> Customer:
@@ -68,6 +78,47 @@ def test_delete_customer(client: TestClient, session: Session):
     assert response.status_code == 404
 
 
+def test_delete_customer_cascades(client: TestClient, session: Session):
+    customer = create_test_customer(session)
+    plan = create_test_plan(session)
+    customer_id, plan_id = customer.id, plan.id
+    client.post(f"/customers/{customer_id}/subscribe/{plan_id}")
+    session.add(Transaction(amount=10.0, customer_id=customer_id))
+    session.add(
+        ArchivedTransaction(
+            id=1000,
+            amount=5.0,
+            customer_id=customer_id,
+            created_at=datetime.now(timezone.utc),
+        )
+    )
+    session.commit()
+
+    response = client.delete(f"/customers/{customer_id}")
+    assert response.status_code == 204
+
+    session.expire_all()
+    assert session.exec(select(Transaction)).all() == []
+    assert session.exec(select(ArchivedTransaction)).all() == []
+    assert session.exec(select(CustomerPlan)).all() == []
+    assert session.get(Plan, plan_id) is not None
+
+
+def test_bulk_delete_customers(client: TestClient, session: Session):
+    first = create_test_customer(session)
+    second = Customer(name="Second", email="second@example.com")
+    third = Customer(name="Third", email="third@example.com")
+    session.add_all([second, third])
+    session.commit()
+    third_id = third.id
+
+    response = client.delete("/customers/", params={"ids": [first.id, second.id, 999]})
+    assert response.status_code == 204
+
+    response = client.get("/customers/")
+    assert [c["id"] for c in response.json()] == [third_id]
+
+
 def test_subscribe_customer_to_plan(client: TestClient, session: Session):
     customer = create_test_customer(session)
     plan = create_test_plan(session)
@@ -105,3 +156,23 @@ def test_update_non_existent_customer(client: TestClient):
 def test_delete_non_existent_customer(client: TestClient):
     response = client.delete("/customers/999")
     assert response.status_code == 404
+
+
+def test_create_missing_indexes():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        # Created before customer_id and plan_id were indexed
+        conn.exec_driver_sql(
+            "CREATE TABLE customerplan (id INTEGER NOT NULL PRIMARY KEY, "
+            "plan_id INTEGER NOT NULL, customer_id INTEGER NOT NULL, "
+            "status VARCHAR(8) NOT NULL)"
+        )
+
+    create_missing_indexes(engine)
+    create_missing_indexes(engine)
+
+    indexed_columns = {
+        tuple(index["column_names"])
+        for index in inspect(engine).get_indexes("customerplan")
+    }
+    assert indexed_columns == {("customer_id",), ("plan_id",)}
@@ -1,7 +1,7 @@
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, select
 
-from app.models import Plan, PlanCreate
+from app.models import Customer, CustomerPlan, Plan, PlanCreate
 
 
 def create_test_plan(session: Session) -> Plan:
@@ -63,6 +63,36 @@ def test_delete_plan(client: TestClient, session: Session):
     assert response.status_code == 404
 
 
+def test_delete_plan_cascades(client: TestClient, session: Session):
+    plan = create_test_plan(session)
+    customer = Customer(name="Test Customer", email="test@example.com")
+    session.add(customer)
+    session.commit()
+    plan_id, customer_id = plan.id, customer.id
+    session.add(CustomerPlan(plan_id=plan_id, customer_id=customer_id))
+    session.commit()
+
+    response = client.delete(f"/plans/{plan_id}")
+    assert response.status_code == 204
+
+    session.expire_all()
+    assert session.exec(select(CustomerPlan)).all() == []
+    assert session.get(Customer, customer_id) is not None
+
+
+def test_bulk_delete_plans(client: TestClient, session: Session):
+    first = create_test_plan(session)
+    second = create_test_plan(session)
+    third = create_test_plan(session)
+    third_id = third.id
+
+    response = client.delete("/plans/", params={"ids": [first.id, second.id]})
+    assert response.status_code == 204
+
+    response = client.get("/plans/")
+    assert [p["id"] for p in response.json()] == [third_id]
+
+
 def test_get_non_existent_plan(client: TestClient):
     response = client.get("/plans/999")
     assert response.status_code == 404
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, create_engine, select
+
+from app import profiling
+from app.main import profile_request
+from app.models import Customer
+
+
+def spin(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture(name="profiled_client")
+def profiled_client_fixture(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    profiled_app = FastAPI()
+    profiled_app.middleware("http")(profile_request)
+
+    @profiled_app.get("/spin")
+    async def spin_route():
+        spin(0.05)
+        return {}
+
+    @profiled_app.get("/sleep")
+    async def sleep_route():
+        await asyncio.sleep(0.05)
+        return {}
+
+    return TestClient(profiled_app)
+
+
+def read_profile(path: Path) -> dict[str, int]:
+    stacks = {}
+    for line in path.read_text().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        stacks[stack] = int(count)
+    return stacks
+
+
+def test_profile_request_with_token(profiled_client: TestClient, tmp_path: Path):
+    response = profiled_client.get("/spin", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+    profile_name = response.headers["X-Profile-File"]
+    assert "/" not in profile_name
+    stacks = read_profile(tmp_path / profile_name)
+    assert sum(stacks.values()) > 0
+    assert any("spin_route" in stack for stack in stacks)
+
+
+def test_profile_skips_time_spent_awaiting(profiled_client: TestClient, tmp_path: Path):
+    response = profiled_client.get("/sleep", headers={"X-Profile": "secret"})
+    stacks = read_profile(tmp_path / response.headers["X-Profile-File"])
+    # 50ms of sleeping would be ~50 samples if awaiting were recorded
+    assert sum(stacks.values()) < 10
+
+
+def test_sampled_profile_hides_file(
+    profiled_client: TestClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 2)
+    for _ in range(3):
+        response = profiled_client.get("/spin")
+        assert "X-Profile-File" not in response.headers
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_profile_retention_keeps_only_latest(
+    profiled_client: TestClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+):
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 0)
+    for _ in range(3):
+        response = profiled_client.get("/spin", headers={"X-Profile": "secret"})
+    assert [p.name for p in tmp_path.iterdir()] == [response.headers["X-Profile-File"]]
+
+
+def test_profile_request_with_wrong_token(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    response = client.get("/customers/", headers={"X-Profile": "wrong"})
+    assert response.status_code == 200
+    assert "X-Profile-File" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_slow_query_log(tmp_path: Path):
+    log_file = tmp_path / "slow_queries.log"
+    engine = create_engine("sqlite://")
+    Customer.__table__.create(engine)
+    profiling.log_slow_queries(engine, threshold=0, log_file=str(log_file))
+    with Session(engine) as session:
+        session.exec(select(Customer).where(Customer.id == 42)).all()
+
+    log = log_file.read_text()
+    assert "SLOW QUERY" in log
+    assert "params: (42," in log
+    assert "plan: SEARCH customer USING INTEGER PRIMARY KEY" in log
+
+
+def test_slow_query_log_records_failed_statements(tmp_path: Path):
+    log_file = tmp_path / "slow_queries.log"
+    engine = create_engine("sqlite://")
+    Customer.__table__.create(engine)
+    profiling.log_slow_queries(engine, threshold=0, log_file=str(log_file))
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(IntegrityError):
+                conn.execute(insert(Customer).values(id=1, name=None, email="a"))
+            conn.rollback()
+        assert "query_start_time" not in conn.info
+
+    log = log_file.read_text()
+    assert log.count("error: IntegrityError") == 3
+    assert "SLOW QUERY" in log
@@ -1,7 +1,12 @@
+from datetime import datetime, timedelta, timezone
+
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, create_engine, select
+from sqlmodel.pool import StaticPool
 
-from app.models import Transaction, TransactionCreate
+from app.archive import archive_lock, archive_transactions
+from app.db import migrate_transaction_table
+from app.models import ArchivedTransaction, Transaction, TransactionCreate
 from app.tests.test_customers import create_test_customer
 
 
@@ -84,3 +89,98 @@ def test_update_non_existent_transaction(client: TestClient):
 def test_delete_non_existent_transaction(client: TestClient):
     response = client.delete("/transactions/999")
     assert response.status_code == 404
+
+
+def test_archive_transactions(client: TestClient, session: Session):
+    customer = create_test_customer(session)
+    old = create_test_transaction(session, customer.id)
+    old.created_at = datetime.now(timezone.utc) - timedelta(days=400)
+    session.add(old)
+    session.commit()
+    old_id = old.id
+    recent_id = create_test_transaction(session, customer.id).id
+
+    moved = archive_transactions(
+        session.get_bind(), datetime.now(timezone.utc) - timedelta(days=365)
+    )
+    assert moved == 1
+    session.expire_all()
+    assert session.get(Transaction, old_id) is None
+    assert session.get(ArchivedTransaction, old_id) is not None
+
+    response = client.get(f"/transactions/{old_id}")
+    assert response.status_code == 200
+    assert response.json()["id"] == old_id
+
+    response = client.get("/transactions/")
+    assert [t["id"] for t in response.json()] == [old_id, recent_id]
+
+    # Archived ids are never handed out again to new hot rows
+    create_test_transaction(session, customer.id)
+    response = client.get("/transactions/")
+    assert len({t["id"] for t in response.json()}) == 3
+
+
+def test_archive_old_transactions_endpoint(client: TestClient, session: Session):
+    customer = create_test_customer(session)
+    transaction_id = create_test_transaction(session, customer.id).id
+    response = client.post("/transactions/archive?older_than_days=0")
+    assert response.status_code == 202
+
+    session.expire_all()
+    assert session.get(ArchivedTransaction, transaction_id) is not None
+    assert not archive_lock.locked()
+    auto_vacuum = session.connection().exec_driver_sql("PRAGMA main.auto_vacuum")
+    assert auto_vacuum.scalar() == 2
+    response = client.delete(f"/transactions/{transaction_id}")
+    assert response.status_code == 204
+    response = client.get(f"/transactions/{transaction_id}")
+    assert response.status_code == 404
+
+
+def test_archive_job_already_running(client: TestClient):
+    with archive_lock:
+        response = client.post("/transactions/archive")
+    assert response.status_code == 409
+
+
+def test_archive_rejects_out_of_range_age(client: TestClient):
+    response = client.post("/transactions/archive?older_than_days=1000000")
+    assert response.status_code == 422
+    assert not archive_lock.locked()
+    response = client.post("/transactions/archive?older_than_days=36500")
+    assert response.status_code == 202
+    assert not archive_lock.locked()
+
+
+def test_migrate_transaction_table():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        # Schema created by versions before transactions could be archived
+        conn.exec_driver_sql(
+            'CREATE TABLE "transaction" (amount FLOAT NOT NULL, '
+            "description VARCHAR, customer_id INTEGER NOT NULL, "
+            "id INTEGER NOT NULL, PRIMARY KEY (id), "
+            "FOREIGN KEY(customer_id) REFERENCES customer (id))"
+        )
+        conn.exec_driver_sql(
+            'INSERT INTO "transaction" (id, amount, description, customer_id) '
+            "VALUES (7, 10.0, 'Old', 1)"
+        )
+
+    migrate_transaction_table(engine)
+    migrate_transaction_table(engine)
+
+    with Session(engine) as session:
+        transaction = session.exec(select(Transaction)).one()
+        assert transaction.id == 7
+        assert transaction.description == "Old"
+        assert transaction.created_at is not None
+
+        # New rows must not reuse ids, even after the highest one is archived
+        session.delete(transaction)
+        session.commit()
+        new_transaction = Transaction(amount=1.0, customer_id=1)
+        session.add(new_transaction)
+        session.commit()
+        assert new_transaction.id == 8
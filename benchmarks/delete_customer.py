@@ -0,0 +1,77 @@
+"""Time deleting a customer that owns 1M transactions, next to another
+customer whose rows must survive.
+
+Run with: python -m benchmarks.delete_customer [transactions]
+"""
+
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import func, insert
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.cascade import delete_customers
+from app.db import attach_archive
+from app.models import Customer, Transaction
+
+TRANSACTIONS = 1_000_000
+INSERT_BATCH_SIZE = 100_000
+
+
+def main(transactions: int = TRANSACTIONS):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.sqlite3'}")
+        attach_archive(engine, str(Path(tmp) / "archive.sqlite3"))
+        SQLModel.metadata.create_all(engine)
+
+        with Session(engine) as session:
+            customers = [
+                Customer(name=name, email=f"{name}@example.com")
+                for name in ("target", "other")
+            ]
+            session.add_all(customers)
+            session.commit()
+            target_id, other_id = (customer.id for customer in customers)
+
+            created_at = datetime.now(timezone.utc)
+            others = transactions // 10
+            total = transactions + others
+            for start in range(0, total, INSERT_BATCH_SIZE):
+                session.exec(
+                    insert(Transaction),
+                    params=[
+                        {
+                            "amount": 1.0,
+                            "customer_id": other_id if i < others else target_id,
+                            "created_at": created_at,
+                        }
+                        for i in range(start, min(start + INSERT_BATCH_SIZE, total))
+                    ],
+                )
+            session.commit()
+
+            start_time = time.perf_counter()
+            delete_customers(session, [target_id])
+            session.commit()
+            elapsed = time.perf_counter() - start_time
+
+            def count_transactions(customer_id: int) -> int:
+                return session.exec(
+                    select(func.count())
+                    .select_from(Transaction)
+                    .where(Transaction.customer_id == customer_id)
+                ).one()
+
+            assert count_transactions(target_id) == 0
+            assert count_transactions(other_id) == others
+            assert session.get(Customer, target_id) is None
+            assert session.get(Customer, other_id) is not None
+
+        print(f"Deleted customer with {transactions} transactions in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else TRANSACTIONS)